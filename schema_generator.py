@@ -0,0 +1,597 @@
+"""Schema generation and merging logic.
+
+This module is kept free of I/O and third-party imports so that it can be
+compiled with mypyc for faster schema generation on large inputs.
+"""
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple, Union, Set
+
+# Map Python types to JSON Schema types. Keyed on the exact type so that
+# bool is never mistaken for int.
+_TYPE_MAP = {
+    bool: "boolean",
+    int: "number",
+    float: "number",
+    str: "string",
+    list: "array",
+    dict: "object",
+    type(None): "null",
+}
+
+# Python types that map to a JSON Schema leaf type
+_SCALAR_TYPES = frozenset(t for t, json_type in _TYPE_MAP.items() if json_type not in ("array", "object"))
+
+def get_json_type(value: Any) -> str:
+    """Convert Python type to JSON Schema type."""
+    json_type = _TYPE_MAP.get(type(value))
+    if json_type is not None:
+        return json_type
+    
+    # Subclasses such as OrderedDict or IntEnum are not in the map
+    if isinstance(value, bool):
+        return "boolean"
+    elif isinstance(value, (int, float)):
+        return "number"
+    elif isinstance(value, str):
+        return "string"
+    elif isinstance(value, list):
+        return "array"
+    elif isinstance(value, dict):
+        return "object"
+    else:
+        return "unknown"
+
+def normalize_type(schema_type: Any) -> Set[str]:
+    """Normalize schema type to a set of types."""
+    if isinstance(schema_type, str):
+        return {schema_type}
+    elif isinstance(schema_type, list):
+        return set(schema_type)
+    else:
+        return set()
+
+# Sort order of types in unions, for deterministic output
+_TYPE_RANK = {t: i for i, t in enumerate(["null", "boolean", "number", "string", "array", "object"])}
+
+def union_types(all_types: Set[str]) -> Union[str, List[str]]:
+    """Turn a set of types into a single type or a sorted list of types."""
+    if len(all_types) == 1:
+        return next(iter(all_types))
+    else:
+        return sorted(all_types, key=lambda x: _TYPE_RANK.get(x, 999))
+
+def merge_types(existing_types: Set[str], new_type: str) -> Union[str, List[str]]:
+    """Merge existing schema types with a new type."""
+    # Avoid building a new set when the type is already known
+    return union_types(existing_types if new_type in existing_types else existing_types | {new_type})
+
+# Objects and arrays can nest through each other, so the functions below call
+# each other for every level of nesting. To keep deeply nested data from
+# hitting the recursion limit, their work is done by generators that yield
+# the generator of each call they depend on and are sent back its result.
+# _run drives them from an explicit stack.
+_Steps = Generator[Any, Any, Dict[str, Any]]
+
+def _run(steps: _Steps) -> Dict[str, Any]:
+    """Run a generator of steps, and every call it yields, to completion."""
+    stack = [steps]
+    result: Any = None
+    while True:
+        try:
+            call = stack[-1].send(result)
+        except StopIteration as done:
+            stack.pop()
+            if not stack:
+                return done.value
+            result = done.value
+        else:
+            stack.append(call)
+            result = None
+
+def analyze_array_items(items: List[Any], existing_schema: Optional[Dict[str, Any]] = None, cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """Analyze array items to determine schema structure."""
+    schema = _analyze_flat_array(items, existing_schema)
+    if schema is None:
+        schema = _run(_analyze_array_items_steps(items, existing_schema, cache))
+    return schema
+
+def _analyze_flat_array(items: List[Any], existing_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Analyze an array that is empty or whose items all have one non-object type.
+
+    Such arrays cannot nest any further, so they are handled without steps.
+    Returns None for any other array.
+    """
+    if not items:
+        return existing_schema or {"type": "array", "items": {}}
+    
+    # Check if all items are the same type. Arrays of a single scalar type
+    # are by far the most common, so check those without get_json_type.
+    first_type = type(items[0])
+    if first_type in _SCALAR_TYPES and all(type(item) is first_type for item in items):
+        unique_types = {_TYPE_MAP[first_type]}
+    else:
+        unique_types = {get_json_type(item) for item in items}
+    
+    if len(unique_types) != 1 or "object" in unique_types:
+        return None
+    
+    # Homogeneous array
+    item_type = next(iter(unique_types))
+    
+    # Handle existing schema
+    if existing_schema and "items" in existing_schema:
+        if isinstance(existing_schema["items"], dict):
+            existing_types = normalize_type(existing_schema["items"].get("type", ""))
+            new_type = merge_types(existing_types, item_type)
+            return {"type": "array", "items": {"type": new_type}}
+    
+    return {"type": "array", "items": {"type": item_type}}
+
+def _analyze_array_items_steps(items: List[Any], existing_schema: Optional[Dict[str, Any]], cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]]) -> _Steps:
+    """Analyze a non-empty array of objects or of mixed types."""
+    if all(isinstance(item, dict) for item in items):
+        # All objects - merge their schemas
+        merged_schema = yield _fold_object_array_steps(items, cache)
+        
+        # If existing schema exists, merge with it
+        if existing_schema and "items" in existing_schema:
+            if isinstance(existing_schema["items"], dict) and existing_schema["items"].get("type") == "object":
+                merged_schema = yield _merge_object_steps(existing_schema["items"], merged_schema)
+        
+        return {"type": "array", "items": merged_schema}
+    else:
+        # Heterogeneous array - use tuple validation
+        item_schemas = []
+        for item in items:
+            if isinstance(item, dict):
+                item_schemas.append((yield _generate_object_steps(item, None, cache)))
+            else:
+                item_schemas.append({"type": get_json_type(item)})
+        
+        # If existing schema has tuple validation, try to merge
+        if existing_schema and "items" in existing_schema and isinstance(existing_schema["items"], list):
+            # Extend existing tuple schema
+            existing_items = existing_schema["items"][:]
+            for i, new_item in enumerate(item_schemas):
+                if i < len(existing_items):
+                    # Merge with existing item schema
+                    if existing_items[i].get("type") == "object" and new_item.get("type") == "object":
+                        existing_items[i] = yield _merge_object_steps(existing_items[i], new_item)
+                    elif existing_items[i].get("type") != new_item.get("type"):
+                        # Different types - make it more flexible
+                        existing_types = normalize_type(existing_items[i].get("type", ""))
+                        new_type = merge_types(existing_types, new_item.get("type", ""))
+                        existing_items[i] = {"type": new_type}
+                else:
+                    # Add new item
+                    existing_items.append(new_item)
+            
+            return {
+                "type": "array",
+                "items": existing_items,
+                "additionalItems": existing_schema.get("additionalItems", False)
+            }
+        
+        return {
+            "type": "array",
+            "items": item_schemas,
+            "additionalItems": False
+        }
+
+def _shape_signature(value: Any) -> Tuple[Any, ...]:
+    """Build a hashable fingerprint of the structure and leaf types of a value.
+
+    Values with equal signatures always produce equal schemas. The signature
+    is a flat tuple of tokens built from an explicit stack, so building,
+    hashing and comparing it never recurses, however deep the value is.
+    """
+    tokens: List[Any] = []
+    # Each entry says whether it holds an object key or a value, so keys can
+    # be told apart from string values
+    stack: List[Tuple[bool, Any]] = [(False, value)]
+    while stack:
+        is_key, node = stack.pop()
+        if is_key:
+            tokens.append(node)
+        elif isinstance(node, dict):
+            # Like generate_object_schema, treat dict subclasses as objects
+            tokens.append(dict)
+            tokens.append(len(node))
+            for key, item in reversed(node.items()):
+                stack.append((False, item))
+                stack.append((True, key))
+        elif isinstance(node, list):
+            # Non-empty arrays of one scalar type have the same schema
+            # whatever their length
+            if node:
+                first_type = type(node[0])
+                if first_type in _SCALAR_TYPES and all(type(item) is first_type for item in node):
+                    tokens.append((list, first_type))
+                    continue
+            tokens.append(list)
+            tokens.append(len(node))
+            stack.extend([(False, item) for item in reversed(node)])
+        else:
+            tokens.append(type(node))
+    return tuple(tokens)
+
+# Upper bound on the number of distinct item shapes remembered while folding
+# an object array. Beyond that, deduplication is unlikely to pay off.
+_MAX_FOLD_SHAPES = 1024
+
+def _fold_object_array_steps(items: Iterable[Dict[str, Any]], cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None) -> _Steps:
+    """Merge the schemas of a list of objects in a single pass.
+
+    Equivalent to pairwise merge_object_schemas over all items, but properties
+    and required fields are accumulated once and only sorted at the end.
+    """
+    properties: Dict[str, Any] = {}
+    required: Optional[Set[str]] = None
+    # Number of times each distinct item shape has been merged, or None once
+    # there are too many shapes to keep track of. Skipping only starts at the
+    # third item, so shorter lists are not fingerprinted at all; otherwise
+    # objects nested through single-item arrays would be fingerprinted once
+    # per level.
+    seen_shapes: Optional[Dict[Tuple[Any, ...], int]] = None
+    if not isinstance(items, list) or len(items) > 2:
+        seen_shapes = {}
+    
+    for item in items:
+        # Merging a schema with itself once can still drop empty "items",
+        # after that merging the same shape again is a no-op
+        if seen_shapes is not None:
+            shape = _shape_signature(item)
+            seen = seen_shapes.get(shape, 0)
+            if seen >= 2:
+                continue
+            if seen == 0 and len(seen_shapes) >= _MAX_FOLD_SHAPES:
+                # Stop deduplicating and release the signatures
+                seen_shapes = None
+            else:
+                seen_shapes[shape] = seen + 1
+        
+        item_schema = yield _generate_object_steps(item, None, cache)
+        for key, prop in item_schema["properties"].items():
+            existing_prop = properties.get(key)
+            if not existing_prop:
+                properties[key] = prop
+            elif existing_prop.get("type") == prop.get("type") and prop.get("type") in ("object", "array"):
+                properties[key] = yield _merge_property_steps(existing_prop, prop)
+            else:
+                properties[key] = _merge_leaf_schemas(existing_prop, prop)
+        
+        # A field is only required if every item has it. The set only ever
+        # shrinks, so narrow it in place.
+        if required is None:
+            required = set(item_schema["required"])
+        else:
+            required.intersection_update(item_schema["required"])
+    
+    return {
+        "type": "object",
+        "properties": {key: properties[key] for key in sorted(properties)},
+        "required": sorted(required or ())
+    }
+
+def merge_array_schemas(schema1: Dict[str, Any], schema2: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two array schemas."""
+    return _run(_merge_array_steps(schema1, schema2))
+
+def _merge_array_steps(schema1: Dict[str, Any], schema2: Dict[str, Any]) -> _Steps:
+    merged: Dict[str, Any] = {"type": "array"}
+    
+    items1 = schema1.get("items", {})
+    items2 = schema2.get("items", {})
+    
+    # Handle tuple validation (items as list)
+    if isinstance(items1, list) and isinstance(items2, list):
+        # Merge tuple schemas
+        max_len = max(len(items1), len(items2))
+        merged_items: List[Any] = []
+        
+        for i in range(max_len):
+            item1 = items1[i] if i < len(items1) else None
+            item2 = items2[i] if i < len(items2) else None
+            
+            if item1 and item2:
+                t1, t2 = item1.get("type"), item2.get("type")
+                if t1 == "object" and t2 == "object":
+                    merged_items.append((yield _merge_object_steps(item1, item2)))
+                elif t1 == t2:
+                    merged_items.append(item1)
+                else:
+                    # Different types - create union
+                    type1 = normalize_type(item1.get("type", ""))
+                    type2 = normalize_type(item2.get("type", ""))
+                    merged_type = union_types(type1 | type2)
+                    merged_items.append({"type": merged_type})
+            elif item1:
+                merged_items.append(item1)
+            else:
+                merged_items.append(item2)
+        
+        merged["items"] = merged_items
+        merged["additionalItems"] = schema1.get("additionalItems", schema2.get("additionalItems", False))
+        
+    # Handle single item type (items as object)
+    elif isinstance(items1, dict) and isinstance(items2, dict):
+        t1, t2 = items1.get("type"), items2.get("type")
+        if t1 == "object" and t2 == "object":
+            merged["items"] = yield _merge_object_steps(items1, items2)
+        elif t1 == t2:
+            merged["items"] = items1
+        else:
+            # Different types - create union
+            type1 = normalize_type(items1.get("type", ""))
+            type2 = normalize_type(items2.get("type", ""))
+            merged_type = union_types(type1 | type2)
+            merged["items"] = {"type": merged_type}
+    
+    # Handle mixed cases
+    elif isinstance(items1, list):
+        merged["items"] = items1
+        merged["additionalItems"] = schema1.get("additionalItems", False)
+    elif isinstance(items2, list):
+        merged["items"] = items2  
+        merged["additionalItems"] = schema2.get("additionalItems", False)
+    elif items1:
+        merged["items"] = items1
+    elif items2:
+        merged["items"] = items2
+    
+    return merged
+
+def merge_property_schemas(prop1: Dict[str, Any], prop2: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two schemas describing the same property."""
+    return _run(_merge_property_steps(prop1, prop2))
+
+def _merge_property_steps(prop1: Dict[str, Any], prop2: Dict[str, Any]) -> _Steps:
+    t1, t2 = prop1.get("type"), prop2.get("type")
+    if t1 == "object" and t2 == "object":
+        return (yield _merge_object_steps(prop1, prop2))
+    elif t1 == "array" and t2 == "array":
+        return (yield _merge_array_steps(prop1, prop2))
+    else:
+        return _merge_leaf_schemas(prop1, prop2)
+
+def _merge_leaf_schemas(prop1: Dict[str, Any], prop2: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two property schemas that are not both objects or both arrays."""
+    if prop1.get("type") == prop2.get("type"):
+        return prop1  # Same type, keep existing (shared, never mutated)
+    else:
+        # Different types - make it flexible
+        type1 = normalize_type(prop1.get("type", ""))
+        type2 = normalize_type(prop2.get("type", ""))
+        merged_type = union_types(type1 | type2)
+        return {"type": merged_type}
+
+def merge_object_schemas(schema1: Dict[str, Any], schema2: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two object schemas, combining properties and making required fields optional if not in both."""
+    return _run(_merge_object_steps(schema1, schema2))
+
+def _merge_object_steps(schema1: Dict[str, Any], schema2: Dict[str, Any]) -> _Steps:
+    merged: Dict[str, Any] = {}
+    
+    # Nested object properties are merged from an explicit stack instead of
+    # recursively, so deeply nested schemas don't hit the recursion limit.
+    # Each nested merged schema is created empty in its parent and filled in
+    # once it is popped.
+    stack = [(schema1, schema2, merged)]
+    while stack:
+        s1, s2, target = stack.pop()
+        properties: Dict[str, Any] = {}
+        target["type"] = "object"
+        target["properties"] = properties
+        
+        p1 = s1.get("properties") or {}
+        p2 = s2.get("properties") or {}
+        
+        # Walk both property lists in sorted order for deterministic output.
+        # Generated properties are already sorted, which Timsort handles in
+        # linear time; sorting here only matters for user supplied schemas.
+        keys1 = sorted(p1)
+        keys2 = sorted(p2)
+        i, j = 0, 0
+        n1, n2 = len(keys1), len(keys2)
+        
+        while i < n1 or j < n2:
+            if j == n2 or (i < n1 and keys1[i] < keys2[j]):
+                prop = keys1[i]
+                i += 1
+            elif i == n1 or keys2[j] < keys1[i]:
+                prop = keys2[j]
+                j += 1
+            else:
+                prop = keys1[i]
+                i += 1
+                j += 1
+            
+            prop1 = p1.get(prop)
+            prop2 = p2.get(prop)
+            
+            if prop1 and prop2:
+                # Both schemas have this property - merge them
+                t1, t2 = prop1.get("type"), prop2.get("type")
+                if t1 == "object" and t2 == "object":
+                    child: Dict[str, Any] = {}
+                    properties[prop] = child
+                    stack.append((prop1, prop2, child))
+                elif t1 == "array" and t2 == "array":
+                    properties[prop] = yield _merge_array_steps(prop1, prop2)
+                else:
+                    properties[prop] = _merge_leaf_schemas(prop1, prop2)
+            elif prop1:
+                properties[prop] = prop1
+            else:
+                properties[prop] = prop2
+        
+        # For required fields: only include fields that are required in BOTH schemas
+        # This ensures the new schema validates data that fits either the old or new structure
+        req1 = set(s1.get("required", []))
+        req2 = set(s2.get("required", []))
+        target["required"] = sorted(req1 & req2)
+    
+    return merged
+
+def generate_object_schema(obj: Dict[str, Any], existing_schema: Optional[Dict[str, Any]] = None, cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """Generate schema for a JSON object.
+
+    If a cache is given, schemas of objects seen before (by identity) are
+    reused instead of being rebuilt. Cached schemas are shared, so callers
+    must not mutate the returned dict.
+    """
+    return _run(_generate_object_steps(obj, existing_schema, cache))
+
+def _generate_object_steps(obj: Dict[str, Any], existing_schema: Optional[Dict[str, Any]], cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]]) -> _Steps:
+    if cache is not None and existing_schema is None:
+        cached = cache.get(id(obj))
+        if cached is not None:
+            return cached[1]
+
+    root: Dict[str, Any] = {}
+    
+    # Nested objects are processed from an explicit stack instead of
+    # recursively, so deeply nested data doesn't hit the recursion limit.
+    # Each nested object schema is created empty in its parent and filled
+    # in once it is popped.
+    stack = [(obj, existing_schema, root)]
+    while stack:
+        node, node_existing, schema = stack.pop()
+        properties: Dict[str, Any] = {}
+        # Track required fields in a set and only sort them at the end
+        required: Set[str] = set()
+        
+        # Start with existing schema if provided
+        if node_existing and node_existing.get("type") == "object":
+            properties = node_existing.get("properties", {}).copy()
+            required.update(node_existing.get("required", []))
+        schema["type"] = "object"
+        schema["properties"] = properties
+        
+        # Process object keys in sorted order for deterministic output
+        for key in sorted(node.keys()):
+            value = node[key]
+            existing_prop = properties.get(key)
+            
+            if isinstance(value, dict):
+                cached = cache.get(id(value)) if cache is not None and existing_prop is None else None
+                if cached is not None:
+                    properties[key] = cached[1]
+                else:
+                    child: Dict[str, Any] = {}
+                    properties[key] = child
+                    stack.append((value, existing_prop, child))
+            elif isinstance(value, list):
+                array_schema = _analyze_flat_array(value, existing_prop)
+                if array_schema is None:
+                    array_schema = yield _analyze_array_items_steps(value, existing_prop, cache)
+                properties[key] = array_schema
+            else:
+                new_type = get_json_type(value)
+                if existing_prop:
+                    existing_types = normalize_type(existing_prop.get("type", ""))
+                    merged_type = merge_types(existing_types, new_type)
+                    properties[key] = {"type": merged_type}
+                else:
+                    properties[key] = {"type": new_type}
+            
+            required.add(key)
+        
+        schema["required"] = sorted(required)
+        if cache is not None and node_existing is None:
+            # Keep a strong reference to node so its id cannot be reused
+            cache[id(node)] = (node, schema)
+    
+    return root
+
+def extend_schema(existing_schema: Dict[str, Any], new_data: Any) -> Dict[str, Any]:
+    """Create a new schema that accommodates both existing schema and new data.
+
+    The existing schema is not modified, but the result may share unchanged
+    sub-schemas with it.
+    """
+    return merge_root_schemas(existing_schema, generate_schema(new_data))
+
+# Upper bound on the number of distinct data shapes a compiled extender remembers
+_MAX_EXTENDER_SHAPES = 4096
+
+def compile_extender(existing_schema: Dict[str, Any]) -> Callable[[Any], Dict[str, Any]]:
+    """Specialize extend_schema for a fixed existing schema.
+
+    The returned function gives the same result as extend_schema(existing_schema,
+    new_data), but only runs the merge once per distinct shape of new data.
+    This pays off when many records are checked against the same schema.
+    Results are shared between calls and must not be mutated.
+    """
+    results: Dict[Any, Dict[str, Any]] = {}
+    
+    def extend(new_data: Any) -> Dict[str, Any]:
+        shape = _shape_signature(new_data)
+        result = results.get(shape)
+        if result is None:
+            result = extend_schema(existing_schema, new_data)
+            if len(results) < _MAX_EXTENDER_SHAPES:
+                results[shape] = result
+        return result
+    
+    return extend
+
+def merge_root_schemas(existing_schema: Dict[str, Any], new_data_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a generated root schema into an existing root schema."""
+    # The merge functions always build new dicts and never mutate their
+    # inputs, so the existing schema does not need to be copied
+    base_schema = existing_schema
+    
+    # Merge the schemas
+    if base_schema.get("type") == "object" and new_data_schema.get("type") == "object":
+        merged = merge_object_schemas(base_schema, new_data_schema)
+    elif base_schema.get("type") == "array" and new_data_schema.get("type") == "array":
+        # Merge array schemas
+        merged = merge_array_schemas(base_schema, new_data_schema)
+    else:
+        # Type mismatch - create a union or use new schema
+        return new_data_schema
+    
+    # Preserve metadata from base schema, first like in generate_schema
+    return {
+        "$schema": base_schema.get("$schema", "http://json-schema.org/draft-07/schema#"),
+        "title": base_schema.get("title", "Extended schema"),
+        **merged
+    }
+
+def generate_schema(data: Any, cache: Optional[Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """Generate JSON Schema from JSON data.
+
+    Parsed JSON never contains the same object twice, so no cache is used by
+    default. Callers whose data shares object references can pass an empty
+    dict as cache to reuse the schema of each object; it keeps every object
+    and its schema alive for as long as the cache is.
+    """
+    schema: Dict[str, Any] = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "title": "Generated schema for Root"
+    }
+    
+    if isinstance(data, dict):
+        object_schema = generate_object_schema(data, cache=cache)
+        schema.update(object_schema)
+    elif isinstance(data, list):
+        array_schema = analyze_array_items(data, cache=cache)
+        schema.update(array_schema)
+    else:
+        schema["type"] = get_json_type(data)
+    
+    return schema
+
+def generate_object_array_schema(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Generate JSON Schema for a non-empty array of objects.
+
+    The items are consumed one at a time, so they can be streamed from a
+    parser instead of being loaded into memory all at once. The result is the
+    same as generate_schema on the equivalent list.
+    """
+    schema: Dict[str, Any] = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "title": "Generated schema for Root"
+    }
+    schema.update({"type": "array", "items": _run(_fold_object_array_steps(items))})
+    return schema
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import orjson
+
+import main
+from schema_generator import generate_schema
+
+
+class GenerateFileSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, content):
+        path = os.path.join(self.tmpdir.name, "data.json")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def assertMatchesInMemory(self, content):
+        path = self.write(content)
+        expected = generate_schema(orjson.loads(content))
+        self.assertEqual(main.generate_file_schema(path), expected)
+        with mock.patch.object(main, "ijson", None):
+            self.assertEqual(main.generate_file_schema(path), expected)
+
+    def test_object_array(self):
+        self.assertMatchesInMemory(b'[{"a": 1, "b": [{"c": "x"}]}, {"a": 2.5}, {"a": 1, "b": []}, {"a": null}]')
+
+    def test_empty_array(self):
+        self.assertMatchesInMemory(b"[]")
+
+    def test_mixed_array(self):
+        self.assertMatchesInMemory(b'[{"a": 1}, {"a": 2}, 3, "x"]')
+
+    def test_top_level_object(self):
+        self.assertMatchesInMemory(b'  {"items": [{"a": 1}]}')
+
+    def test_invalid_json_after_partial_fold(self):
+        path = self.write(b'[{"a": 1}, {"a": 2}, {"a": ')
+        with self.assertRaises(orjson.JSONDecodeError):
+            main.generate_file_schema(path)
+        with mock.patch.object(main, "ijson", None):
+            with self.assertRaises(orjson.JSONDecodeError):
+                main.generate_file_schema(path)
+
+    @unittest.skipIf(main.ijson is None, "ijson is not installed")
+    def test_object_array_is_streamed(self):
+        path = self.write(b'[{"a": 1}, {"b": "x"}]')
+        with mock.patch.object(main.orjson, "loads", side_effect=AssertionError("not streamed")):
+            schema = main.generate_file_schema(path)
+        self.assertEqual(schema, generate_schema([{"a": 1}, {"b": "x"}]))
+
+
+if __name__ == "__main__":
+    unittest.main()
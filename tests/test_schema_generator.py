@@ -0,0 +1,159 @@
+import enum
+import unittest
+from collections import OrderedDict
+from functools import reduce
+
+from schema_generator import (
+    compile_extender,
+    extend_schema,
+    generate_object_schema,
+    generate_schema,
+    get_json_type,
+    merge_object_schemas,
+    merge_property_schemas,
+)
+
+
+class Level(enum.IntEnum):
+    LOW = 1
+
+
+class GetJsonTypeTest(unittest.TestCase):
+    def test_subclasses_use_their_base_type(self):
+        self.assertEqual(get_json_type(OrderedDict()), "object")
+        self.assertEqual(get_json_type(Level.LOW), "number")
+
+    def test_unknown_type(self):
+        self.assertEqual(get_json_type(object()), "unknown")
+
+
+class MergeUnionTypesTest(unittest.TestCase):
+    def test_merge_keeps_all_types_of_right_union(self):
+        merged = merge_property_schemas({"type": "string"}, {"type": ["null", "number"]})
+        self.assertEqual(merged, {"type": ["null", "number", "string"]})
+
+    def test_merge_with_missing_type_adds_no_type(self):
+        merged = merge_property_schemas({"type": "string"}, {"type": None})
+        self.assertEqual(merged, {"type": "string"})
+
+    def test_extend_with_union_typed_property(self):
+        base = generate_schema([{"a": "x"}])
+        schema = extend_schema(base, [{"a": 1}, {"a": None}])
+        self.assertEqual(schema["items"]["properties"]["a"], {"type": ["null", "number", "string"]})
+
+
+class ObjectArrayFoldTest(unittest.TestCase):
+    def assertFoldMatchesPairwise(self, items):
+        pairwise = reduce(merge_object_schemas, [generate_object_schema(item) for item in items])
+        self.assertEqual(generate_schema(items)["items"], pairwise)
+
+    def test_repeated_empty_array_property(self):
+        self.assertFoldMatchesPairwise([{"a": []}] * 4)
+        self.assertFoldMatchesPairwise([{"a": []}, {"a": []}, {"a": []}, {"a": [1]}])
+
+    def test_repeated_nested_shapes(self):
+        self.assertFoldMatchesPairwise([{"a": {"b": []}}] * 3)
+        self.assertFoldMatchesPairwise([{"a": [{"b": []}]}] * 3 + [{"c": 1}])
+        self.assertFoldMatchesPairwise([{"a": [1, "x"]}] * 3 + [{"a": [2]}])
+
+    def test_interleaved_repeated_shapes(self):
+        self.assertFoldMatchesPairwise([{"a": 1}, {"b": "x"}, {"a": 1}, {"b": "x"}, {"a": 1}, {"a": None}])
+
+
+class DictSubclassFoldTest(unittest.TestCase):
+    def test_ordered_dict_shapes_are_kept_apart(self):
+        items = [{"x": OrderedDict(a=1)}, {"x": OrderedDict(a=1)}, {"x": OrderedDict(b="s")}]
+        schema = generate_schema(items)
+        self.assertEqual(
+            schema["items"]["properties"]["x"],
+            {
+                "type": "object",
+                "properties": {"a": {"type": "number"}, "b": {"type": "string"}},
+                "required": [],
+            },
+        )
+
+    def test_compiled_extender_matches_extend_schema(self):
+        base = generate_schema([{"x": {"a": 1}}])
+        extend = compile_extender(base)
+        for data in (
+            [{"x": OrderedDict(a=1)}],
+            [{"x": OrderedDict(b="s")}],
+            [{"x": OrderedDict(a=1)}, {"x": OrderedDict(b="s")}],
+        ):
+            self.assertEqual(extend(data), extend_schema(base, data))
+
+
+class SchemaCacheTest(unittest.TestCase):
+    def test_cache_matches_uncached_output(self):
+        shared = {"id": 1, "tags": ["a"], "owner": {"name": "x"}}
+        data = {
+            "first": shared,
+            "items": [shared, {"id": "2", "owner": shared}, shared],
+            "mixed": [shared, 1, {"nested": shared}],
+            "wrapper": {"inner": shared, "list": [shared]},
+        }
+        self.assertEqual(generate_schema(data, cache={}), generate_schema(data))
+
+    def test_cache_is_filled_for_each_object(self):
+        shared = {"a": {"b": 1}}
+        cache = {}
+        generate_schema([shared, shared], cache=cache)
+        self.assertIn(id(shared), cache)
+        self.assertIn(id(shared["a"]), cache)
+
+
+def nested_object(depth, leaf):
+    value = leaf
+    for _ in range(depth):
+        value = {"a": value}
+    return value
+
+
+def nested_object_array(depth, leaf):
+    value = leaf
+    for _ in range(depth):
+        value = {"a": [value]}
+    return value
+
+
+class DeepNestingTest(unittest.TestCase):
+    DEPTH = 5000
+
+    def test_generate_deep_object(self):
+        schema = generate_schema(nested_object(self.DEPTH, 1))
+        self.assertEqual(schema["type"], "object")
+
+    def test_generate_deep_object_array(self):
+        items = [nested_object(self.DEPTH, 1), nested_object(self.DEPTH, 1)]
+        schema = generate_schema(items)
+        self.assertEqual(schema["items"]["required"], ["a"])
+
+    def test_extend_deep_object(self):
+        base = generate_schema(nested_object(self.DEPTH, 1))
+        schema = extend_schema(base, nested_object(self.DEPTH, "x"))
+        self.assertEqual(schema["required"], ["a"])
+
+    def test_compiled_extender_deep_object(self):
+        base = generate_schema(nested_object(self.DEPTH, 1))
+        extend = compile_extender(base)
+        self.assertIs(extend(nested_object(self.DEPTH, 1)), extend(nested_object(self.DEPTH, 1)))
+
+    def test_generate_deep_object_in_arrays(self):
+        items = [nested_object_array(self.DEPTH, 1), nested_object_array(self.DEPTH, "x")]
+        schema = generate_schema(items)
+        self.assertEqual(schema["items"]["required"], ["a"])
+
+    def test_extend_deep_object_in_arrays(self):
+        base = generate_schema(nested_object_array(self.DEPTH, 1))
+        schema = extend_schema(base, nested_object_array(self.DEPTH, "x"))
+        self.assertEqual(schema["required"], ["a"])
+
+    def test_compiled_extender_deep_object_in_arrays(self):
+        base = generate_schema(nested_object_array(self.DEPTH, 1))
+        extend = compile_extender(base)
+        self.assertEqual(extend(nested_object_array(self.DEPTH, None))["required"], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()